@@ -1,16 +1,29 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
 import pygame
 import json
 import os
-from PIL import Image, ImageTk
 import threading
 import keyboard
-import numpy as np
-import wave
 import io
-import tempfile
 import platform
+import queue
+import collections
+import mmap
+import struct
+import base64
+
+# numpy, wave, tempfile e PIL servono solo per il trimmer, la registrazione
+# e il rendering delle immagini: vengono importati al primo utilizzo.
+
+_IMPORT_TIME = time.perf_counter() - _IMPORT_START
+
+CONFIG_FILE = 'soundboard_config.json'
+SNAPSHOT_FILE = 'soundboard_snapshot.bin'
+STARTUP_BUDGET_MS = 300
 
 class AudioTrimmer:
     def __init__(self, parent, audio_file_path, callback):
@@ -30,6 +43,10 @@ class AudioTrimmer:
         
     def load_audio_data(self, file_path):
         """Carica i dati audio usando pygame e wave"""
+        import numpy as np
+        import wave
+        import tempfile
+        
         try:
             # Prova a caricare come WAV per ottenere info dettagliate
             if file_path.lower().endswith('.wav'):
@@ -141,6 +158,9 @@ class AudioTrimmer:
         threading.Thread(target=lambda: self.sound.play(), daemon=True).start()
         
     def play_selection(self):
+        import wave
+        import tempfile
+        
         try:
             start = float(self.start_var.get())
             end = float(self.end_var.get())
@@ -178,6 +198,9 @@ class AudioTrimmer:
             messagebox.showerror("Errore", f"Errore nella riproduzione: {e}")
             
     def confirm_selection(self):
+        import wave
+        import tempfile
+        
         try:
             start = float(self.start_var.get())
             end = float(self.end_var.get())
@@ -225,6 +248,7 @@ class SoundButton:
         self.hotkey = None
         self.label = f"Tasto {row}-{col}"
         self.sound_object = None
+        self.thumbnail_png = None  # Miniatura già renderizzata (PNG 60x60)
         
         self.setup_ui()
         
@@ -354,16 +378,9 @@ class SoundButton:
         """Riceve i dati audio come bytes WAV"""
         self.sound_data = audio_data
         
-        # Crea un oggetto Sound per pygame
+        # Crea un oggetto Sound per pygame direttamente dalla memoria
         try:
-            # Crea un file temporaneo per pygame
-            temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_file.write(audio_data)
-            temp_file.close()
-            
-            self.sound_object = pygame.mixer.Sound(temp_file.name)
-            os.unlink(temp_file.name)
-            
+            self.sound_object = pygame.mixer.Sound(file=io.BytesIO(audio_data))
         except Exception as e:
             print(f"Errore nella creazione del suono: {e}")
             self.sound_object = None
@@ -377,6 +394,7 @@ class SoundButton:
         )
         if file_path:
             self.image_path = file_path
+            self.thumbnail_png = None
             self.update_button_display()
             
     def set_hotkey(self):
@@ -412,6 +430,7 @@ class SoundButton:
         self.sound_data = None
         self.sound_object = None
         self.image_path = None
+        self.thumbnail_png = None
         self.hotkey = None
         self.label = f"Tasto {self.row}-{self.col}"
         self.update_button_display()
@@ -424,10 +443,10 @@ class SoundButton:
             
         if self.image_path and os.path.exists(self.image_path):
             try:
-                # Carica e ridimensiona l'immagine
-                img = Image.open(self.image_path)
-                img = img.resize((60, 60), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
+                # Usa la miniatura già renderizzata se disponibile
+                if self.thumbnail_png is None:
+                    self.thumbnail_png = self.render_thumbnail(self.image_path)
+                photo = tk.PhotoImage(data=base64.b64encode(self.thumbnail_png).decode('ascii'))
                 
                 self.button.config(image=photo, text=display_text, compound=tk.TOP, 
                                  bg="lightblue" if self.sound_data else "lightgray")
@@ -440,10 +459,22 @@ class SoundButton:
             self.button.config(text=display_text, image="", compound=tk.NONE,
                              bg="lightgreen" if self.sound_data else "lightgray")
             
+    def render_thumbnail(self, image_path):
+        """Carica e ridimensiona l'immagine, restituendo i bytes PNG"""
+        from PIL import Image
+        
+        img = Image.open(image_path).convert('RGBA')
+        img = img.resize((60, 60), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        img.save(output, format='PNG')
+        return output.getvalue()
+            
     def play_sound(self):
         if self.sound_object:
             # Riproduci il suono in un thread separato
             threading.Thread(target=self.sound_object.play, daemon=True).start()
+            # Notifica la soundboard (registrazione della sessione)
+            self.callback(self)
             
     def get_config(self):
         return {
@@ -460,24 +491,589 @@ class SoundButton:
                 self.sound_data = bytes.fromhex(config['sound_data'])
                 
                 # Ricrea l'oggetto Sound
-                temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                temp_file.write(self.sound_data)
-                temp_file.close()
-                
-                self.sound_object = pygame.mixer.Sound(temp_file.name)
-                os.unlink(temp_file.name)
+                self.sound_object = pygame.mixer.Sound(file=io.BytesIO(self.sound_data))
                 
             except Exception as e:
                 print(f"Errore nel caricamento del suono salvato: {e}")
                 
         self.image_path = config.get('image_path')
-        if config.get('hotkey'):
+        self.thumbnail_png = None
+        self.restore_hotkey(config.get('hotkey'))
+        self.update_button_display()
+        
+    def load_snapshot(self, entry):
+        """Ripristina il tasto da una voce dello snapshot precompilato"""
+        self.label = entry['label']
+        # Vista sul file mappato: il WAV originale viene letto solo se serve
+        self.sound_data = entry['sound_data']
+        self.sound_object = None
+        if entry['pcm']:
             try:
-                keyboard.add_hotkey(config['hotkey'], self.play_sound)
-                self.hotkey = config['hotkey']
+                # PCM già nel formato del mixer: nessuna decodifica necessaria
+                self.sound_object = pygame.mixer.Sound(buffer=entry['pcm'])
+            except Exception as e:
+                print(f"Errore nel caricamento del suono salvato: {e}")
+                self.sound_object = None
+                
+        self.image_path = entry['image_path']
+        self.thumbnail_png = entry['thumbnail']
+        self.restore_hotkey(entry['hotkey'])
+        self.update_button_display()
+        
+    def detach_snapshot(self):
+        """Copia in memoria i dati ancora letti dallo snapshot mappato"""
+        if isinstance(self.sound_data, memoryview):
+            self.sound_data = self.sound_data.tobytes()
+            
+    def restore_hotkey(self, hotkey):
+        if hotkey:
+            try:
+                keyboard.add_hotkey(hotkey, self.play_sound)
+                self.hotkey = hotkey
             except:
                 pass
-        self.update_button_display()
+
+class BoardSnapshot:
+    """Snapshot precompilato della griglia per un avvio rapido.
+
+    Il file contiene un'intestazione JSON seguita da un blocco binario con il PCM
+    già nel formato del mixer, i WAV originali e le miniature PNG. All'avvio viene
+    mappato in memoria e i suoni vengono creati dalle viste sul file: niente
+    parsing esadecimale del JSON, niente decodifica audio e niente PIL. È valido solo se corrisponde alla configurazione corrente.
+    """
+
+    MAGIC = b'GSBSNAP1'
+
+    def __init__(self, path=SNAPSHOT_FILE, config_path=CONFIG_FILE):
+        self.path = path
+        self.config_path = config_path
+        self._mm = None
+        self._view = None
+
+    def config_signature(self):
+        stat = os.stat(self.config_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def image_signature(self, image_path):
+        try:
+            return os.stat(image_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def write(self, buttons):
+        """Scrive lo snapshot a partire dai tasti correnti"""
+        blob = bytearray()
+
+        def add(data):
+            if not data:
+                return None
+            offset = len(blob)
+            blob.extend(data)
+            return [offset, len(data)]
+
+        rows = []
+        for row in buttons:
+            row_entries = []
+            for button in row:
+                pcm = button.sound_object.get_raw() if button.sound_object else None
+                if button.image_path and button.thumbnail_png is None and os.path.exists(button.image_path):
+                    try:
+                        button.thumbnail_png = button.render_thumbnail(button.image_path)
+                    except Exception:
+                        pass
+                row_entries.append({
+                    'label': button.label,
+                    'hotkey': button.hotkey,
+                    'image_path': button.image_path,
+                    'image_mtime': self.image_signature(button.image_path) if button.image_path else None,
+                    'sound_data': add(button.sound_data),
+                    'pcm': add(pcm),
+                    'thumbnail': add(button.thumbnail_png if button.image_path else None),
+                })
+            rows.append(row_entries)
+
+        header = json.dumps({
+            'config': self.config_signature(),
+            'mixer': list(pygame.mixer.get_init()),
+            'buttons': rows,
+        }).encode('utf-8')
+
+        # Scrivi su un file temporaneo e sostituisci, per non lasciare snapshot a metà
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            f.write(blob)
+        os.replace(temp_path, self.path)
+
+    def load(self):
+        """Mappa lo snapshot in memoria e restituisce le voci dei tasti.
+
+        PCM e WAV originali sono viste (memoryview) sul file mappato, non copie:
+        la mappatura resta aperta finché non viene chiamato close().
+        Restituisce None se lo snapshot non è utilizzabile.
+        """
+        if not os.path.exists(self.path) or not os.path.exists(self.config_path):
+            return None
+        if os.path.getsize(self.path) == 0:
+            return None
+
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        try:
+            rows = self.read_entries()
+        except Exception:
+            self.close()
+            raise
+        if rows is None:
+            self.close()
+        return rows
+
+    def read_entries(self):
+        view = self._view
+        prefix = len(self.MAGIC) + 4
+        if len(view) < prefix or view[:len(self.MAGIC)] != self.MAGIC:
+            return None
+        header_len, = struct.unpack('<I', view[len(self.MAGIC):prefix])
+        header = json.loads(bytes(view[prefix:prefix + header_len]).decode('utf-8'))
+
+        # Snapshot obsoleto: configurazione o formato audio cambiati
+        if header['config'] != self.config_signature():
+            return None
+        if header['mixer'] != list(pygame.mixer.get_init()):
+            return None
+
+        data_start = prefix + header_len
+
+        def get(span):
+            if not span:
+                return None
+            offset, length = span
+            return view[data_start + offset:data_start + offset + length]
+
+        rows = []
+        for row in header['buttons']:
+            row_entries = []
+            for entry in row:
+                # Le miniature sono piccole: copiale, così non trattengono la mappatura
+                thumbnail = get(entry['thumbnail'])
+                if thumbnail is not None:
+                    thumbnail = bytes(thumbnail)
+                if entry['image_path'] and entry['image_mtime'] != self.image_signature(entry['image_path']):
+                    thumbnail = None
+                row_entries.append({
+                    'label': entry['label'],
+                    'hotkey': entry['hotkey'],
+                    'image_path': entry['image_path'],
+                    'sound_data': get(entry['sound_data']),
+                    'pcm': get(entry['pcm']),
+                    'thumbnail': thumbnail,
+                })
+            rows.append(row_entries)
+        return rows
+
+    def close(self):
+        """Chiude la mappatura; solleva RuntimeError se qualche vista è ancora in uso"""
+        try:
+            if self._view is not None:
+                self._view.release()
+                self._view = None
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+        except BufferError as e:
+            raise RuntimeError(f"lo snapshot è ancora in uso ({e})")
+
+class SessionRecorder:
+    """Registra cosa è stato riprodotto: log dei trigger, mix opzionale e replay buffer.
+
+    Il registratore parte solo quando viene richiesto (registrazione o replay
+    buffer). I trigger vengono accodati senza mai bloccare la riproduzione; un
+    thread di rendering ricostruisce il mix in tempo reale e un thread di
+    scrittura separato si occupa del disco, così un rallentamento del disco non
+    blocca mai né l'audio né l'interfaccia.
+    """
+
+    def __init__(self, sample_rate=44100, channels=2, replay_seconds=120,
+                 block_ms=100, queue_blocks=64, cache_bytes=64 * 1024 * 1024):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_frames = int(sample_rate * block_ms / 1000)
+        self.replay_seconds = replay_seconds
+
+        # Coda dei trigger (riempita dal thread di riproduzione/hotkey): non è
+        # limitata perché i trigger non vanno mai persi e arrivano a ritmo umano
+        self._events = queue.Queue()
+        self._queue_blocks = queue_blocks
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._render_thread = None
+        self._t0 = None
+        self._recording = None
+        # Cache LRU dei suoni decodificati, una voce per tasto, limitata in byte
+        self._decoded = collections.OrderedDict()
+        self._decoded_bytes = 0
+        self._cache_bytes = cache_bytes
+        self.replay_enabled = False
+
+        # Replay buffer: memoria fissa, allocata dal thread di rendering
+        self._replay_lock = threading.Lock()
+        self._replay_frames = int(sample_rate * replay_seconds)
+        self._replay = None
+        self._replay_pos = 0
+        self._replay_full = False
+        self._replay_reset = False
+
+    def _ensure_running(self):
+        """Avvia il thread di rendering se non è attivo (da chiamare con _lock acquisito)"""
+        if self._render_thread is None:
+            self._t0 = time.monotonic()
+            self._stop_event = threading.Event()
+            self._render_thread = threading.Thread(target=self._render_loop,
+                                                   args=(self._stop_event,), daemon=True)
+            self._render_thread.start()
+
+    def set_replay_enabled(self, enabled):
+        """Attiva o disattiva il replay buffer degli ultimi minuti"""
+        with self._lock:
+            self.replay_enabled = enabled
+            if enabled:
+                self._replay_reset = True
+                self._ensure_running()
+
+    def record_trigger(self, key, label, hotkey, sound_data):
+        """Registra un trigger senza mai bloccare; 'key' identifica il tasto nella cache"""
+        if self._render_thread is None:
+            return
+        self._events.put_nowait((time.monotonic(), time.time(), key, label, hotkey, sound_data))
+
+    @property
+    def is_recording(self):
+        return self._recording is not None
+
+    def start_recording(self, log_path, mix_path=None):
+        """Inizia a scrivere il log degli eventi (JSON lines) e, opzionalmente, il mix"""
+        if self._recording is not None:
+            raise RuntimeError("Registrazione già in corso")
+
+        log_file = open(log_path, 'w', encoding='utf-8')
+        try:
+            mix_writer = self._open_mix_writer(mix_path) if mix_path else None
+        except Exception:
+            log_file.close()
+            raise
+
+        recording = {
+            'start': time.monotonic(),
+            'stop': None,
+            # Gli eventi non vengono mai scartati; solo i blocchi audio possono esserlo
+            'events': queue.Queue(),
+            'audio': queue.Queue(maxsize=self._queue_blocks) if mix_writer else None,
+            'closed': threading.Event(),
+            'dropped_blocks': 0,
+            'error': None,
+        }
+        recording['writer'] = threading.Thread(target=self._writer_loop,
+                                               args=(recording, log_file, mix_writer), daemon=True)
+        recording['writer'].start()
+
+        with self._lock:
+            self._recording = recording
+            self._ensure_running()
+
+    def stop_recording(self):
+        """Chiede la chiusura della registrazione senza attendere il disco.
+
+        Restituisce il dizionario della registrazione: quando il suo 'writer' non
+        è più vivo i file sono chiusi e i contatori/errore sono definitivi.
+        """
+        with self._lock:
+            recording = self._recording
+        if recording is None or recording['stop'] is not None:
+            return None
+        recording['stop'] = time.monotonic()
+        return recording
+
+    def save_replay(self, path):
+        """Salva in un file WAV gli ultimi minuti presenti nel replay buffer"""
+        import numpy as np
+        import wave
+        
+        if self._replay is None or not self.replay_enabled:
+            raise RuntimeError("Il replay buffer non è attivo")
+        
+        with self._replay_lock:
+            if self._replay_full:
+                data = np.concatenate((self._replay[self._replay_pos:],
+                                       self._replay[:self._replay_pos]))
+            else:
+                data = self._replay[:self._replay_pos].copy()
+
+        with wave.open(path, 'wb') as wav_file:
+            wav_file.setnchannels(self.channels)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            wav_file.writeframes(data.tobytes())
+        return len(data) / self.sample_rate
+
+    def shutdown(self, timeout=2):
+        """Ferma tutto attendendo al massimo 'timeout' secondi il disco"""
+        self.stop_recording()
+        with self._lock:
+            recording = self._recording
+            render_thread = self._render_thread
+            self._stop_event.set()
+        if render_thread is not None:
+            render_thread.join(timeout=1)
+        if recording is not None:
+            recording['writer'].join(timeout=timeout)
+
+    def _open_mix_writer(self, path):
+        """Restituisce un oggetto con write(blocco) e close() per il file del mix"""
+        if path.lower().endswith('.flac'):
+            try:
+                import soundfile
+                return soundfile.SoundFile(path, 'w', samplerate=self.sample_rate,
+                                           channels=self.channels, subtype='PCM_16')
+            except ImportError:
+                raise RuntimeError("Per salvare in FLAC installa il pacchetto 'soundfile'")
+
+        import wave
+        wav_file = wave.open(path, 'wb')
+        wav_file.setnchannels(self.channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(self.sample_rate)
+
+        class _WavWriter:
+            def write(self, block):
+                wav_file.writeframes(block.tobytes())
+
+            def close(self):
+                wav_file.close()
+
+        return _WavWriter()
+
+    def _decode(self, key, sound_data):
+        """Converte i bytes WAV di un tasto in un array int16 nel formato del mixer"""
+        cached = self._decoded.get(key)
+        if cached is not None:
+            source, samples = cached
+            if source is sound_data:
+                self._decoded.move_to_end(key)
+                return samples
+            # Il suono del tasto è cambiato: scarta la vecchia decodifica
+            self._forget(key)
+
+        import numpy as np
+        import wave
+
+        try:
+            with wave.open(io.BytesIO(sound_data), 'rb') as wav_file:
+                rate = wav_file.getframerate()
+                channels = wav_file.getnchannels()
+                width = wav_file.getsampwidth()
+                frames = wav_file.readframes(-1)
+        except Exception as e:
+            print(f"Errore nella decodifica per la registrazione: {e}")
+            return None
+
+        if width == 2:
+            samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32)
+        elif width == 1:
+            samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) * 256
+        else:
+            print(f"Formato audio non supportato per la registrazione ({width * 8} bit)")
+            return None
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+
+        # Adatta il numero di canali
+        if channels != self.channels:
+            samples = np.repeat(samples.mean(axis=1, keepdims=True), self.channels, axis=1)
+
+        # Ricampiona linearmente se la frequenza è diversa
+        if rate != self.sample_rate and len(samples):
+            length = int(len(samples) * self.sample_rate / rate)
+            src = np.arange(len(samples))
+            dst = np.linspace(0, len(samples) - 1, length)
+            samples = np.stack([np.interp(dst, src, samples[:, c])
+                                for c in range(self.channels)], axis=1)
+
+        result = np.clip(samples, -32768, 32767).astype(np.int16)
+        if result.nbytes + len(sound_data) <= self._cache_bytes:
+            self._decoded[key] = (sound_data, result)
+            self._decoded_bytes += result.nbytes + len(sound_data)
+            while self._decoded_bytes > self._cache_bytes:
+                self._forget(next(iter(self._decoded)))
+        return result
+
+    def _forget(self, key):
+        source, samples = self._decoded.pop(key)
+        self._decoded_bytes -= samples.nbytes + len(source)
+
+    def _finish_recording(self, recording):
+        """Segnala al writer che non arriveranno altri dati e libera il registratore"""
+        recording['closed'].set()
+        with self._lock:
+            if self._recording is recording:
+                self._recording = None
+
+    def _render_loop(self, stop_event):
+        # Import e allocazione avvengono qui, fuori dal thread dell'interfaccia
+        import numpy as np
+
+        with self._replay_lock:
+            if self._replay is None:
+                self._replay = np.zeros((self._replay_frames, self.channels), dtype=np.int16)
+
+        block = self.block_frames
+        rendered = 0
+        voices = []  # [frame di inizio, campioni, posizione]
+        recording = None
+
+        try:
+            while not stop_event.wait(block / self.sample_rate):
+                with self._lock:
+                    recording = self._recording
+                    replay = self.replay_enabled
+                    if recording is None and not replay:
+                        # Nessuno ha più bisogno del mix: ferma il thread e libera la cache
+                        self._render_thread = None
+                        self._decoded.clear()
+                        self._decoded_bytes = 0
+                        return
+                    reset, self._replay_reset = self._replay_reset, False
+                if reset:
+                    with self._replay_lock:
+                        self._replay_pos = 0
+                        self._replay_full = False
+
+                # Tutti i trigger con ts <= now sono già in coda quando la svuotiamo
+                now = time.monotonic()
+                now_frame = int((now - self._t0) * self.sample_rate)
+
+                # Se il thread è rimasto molto indietro (es. sospensione) salta avanti
+                if now_frame - rendered > self.sample_rate * 5:
+                    rendered = now_frame - block
+                    voices = []
+
+                while True:
+                    try:
+                        ts, wall, key, label, hotkey, sound_data = self._events.get_nowait()
+                    except queue.Empty:
+                        break
+                    if ts < self._t0:
+                        continue  # trigger rimasto da un thread precedente
+                    samples = self._decode(key, sound_data) if sound_data else None
+                    if samples is not None:
+                        start = max(int((ts - self._t0) * self.sample_rate), rendered)
+                        voices.append([start, samples, 0])
+                    if recording is not None and self._in_recording(recording, ts):
+                        recording['events'].put({
+                            't': round(ts - recording['start'], 3),
+                            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(wall)),
+                            'label': label,
+                            'hotkey': hotkey,
+                        })
+
+                while rendered + block <= now_frame:
+                    mix = np.zeros((block, self.channels), dtype=np.int32)
+                    for voice in voices:
+                        start, samples, pos = voice
+                        if start >= rendered + block:
+                            continue
+                        offset = max(start - rendered, 0)
+                        count = min(block - offset, len(samples) - pos)
+                        mix[offset:offset + count] += samples[pos:pos + count]
+                        voice[2] += count
+                    voices = [v for v in voices if v[2] < len(v[1])]
+                    out = np.clip(mix, -32768, 32767).astype(np.int16)
+                    block_time = self._t0 + rendered / self.sample_rate
+                    rendered += block
+
+                    if replay:
+                        self._write_replay(out)
+                    if (recording is not None and recording['audio'] is not None
+                            and recording['error'] is None
+                            and self._in_recording(recording, block_time)):
+                        try:
+                            recording['audio'].put_nowait(out)
+                        except queue.Full:
+                            recording['dropped_blocks'] += 1
+
+                # Chiudi quando eventi e audio fino all'istante di stop sono stati emessi
+                stop = recording['stop'] if recording is not None else None
+                if stop is not None and stop <= now and self._t0 + rendered / self.sample_rate >= stop:
+                    self._finish_recording(recording)
+        finally:
+            with self._lock:
+                if self._render_thread is not None and self._stop_event is stop_event:
+                    self._render_thread = None
+                recording = self._recording
+            if recording is not None and stop_event.is_set():
+                if recording['stop'] is None:
+                    recording['stop'] = time.monotonic()
+                self._finish_recording(recording)
+
+    def _in_recording(self, recording, ts):
+        stop = recording['stop']
+        return recording['start'] <= ts and (stop is None or ts < stop)
+
+    def _write_replay(self, block):
+        with self._replay_lock:
+            size = len(self._replay)
+            end = self._replay_pos + len(block)
+            if end <= size:
+                self._replay[self._replay_pos:end] = block
+            else:
+                split = size - self._replay_pos
+                self._replay[self._replay_pos:] = block[:split]
+                self._replay[:end - size] = block[split:]
+                self._replay_full = True
+            self._replay_pos = end % size
+            if end == size:
+                self._replay_full = True
+
+    def _writer_loop(self, recording, log_file, mix_writer):
+        events = recording['events']
+        audio = recording['audio']
+        try:
+            while True:
+                # Leggi il flag prima di svuotare le code, così non si perde nulla
+                closed = recording['closed'].is_set()
+                wrote = False
+                while True:
+                    try:
+                        event = events.get_nowait()
+                    except queue.Empty:
+                        break
+                    log_file.write(json.dumps(event) + "\n")
+                    wrote = True
+                if wrote:
+                    log_file.flush()
+                while audio is not None:
+                    try:
+                        block = audio.get_nowait()
+                    except queue.Empty:
+                        break
+                    mix_writer.write(block)
+                if closed:
+                    break
+                recording['closed'].wait(0.05)
+        except Exception as e:
+            print(f"Errore nella scrittura della registrazione: {e}")
+            recording['error'] = str(e)
+        finally:
+            try:
+                log_file.close()
+                if mix_writer is not None:
+                    mix_writer.close()
+            except Exception as e:
+                print(f"Errore nella chiusura della registrazione: {e}")
+                if recording['error'] is None:
+                    recording['error'] = str(e)
 
 class Soundboard:
     def __init__(self):
@@ -489,6 +1085,10 @@ class Soundboard:
         pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=1024)
         pygame.mixer.init()
         
+        # Registratore della sessione (log dei trigger, mix e replay buffer)
+        frequency, _, channels = pygame.mixer.get_init()
+        self.recorder = SessionRecorder(sample_rate=frequency, channels=channels)
+        
         # Griglia 4x5 di tasti
         self.buttons = []
         self.setup_ui()
@@ -498,14 +1098,32 @@ class Soundboard:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(1, weight=1)
         
-        # Carica configurazione se esistente
+        # Carica configurazione se esistente (dallo snapshot se aggiornato)
+        self.snapshot = None
+        self.config_source = None
         self.load_config()
         
         # Gestione chiusura finestra
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Mostra istruzioni per Mac se necessario
-        self.show_platform_instructions()
+        # Mostra istruzioni per Mac se necessario; la finestra modale falserebbe
+        # la misura, quindi in quel caso il tempo di avvio non viene riportato
+        if not self.show_platform_instructions():
+            self.root.after_idle(self.report_startup)
+        
+    def report_startup(self):
+        """Stampa il tempo di import e il tempo fino all'interattività.
+        
+        I tempi partono dal primo import del modulo: l'avvio dell'interprete
+        Python non è incluso.
+        """
+        interactive_ms = (time.perf_counter() - _IMPORT_START) * 1000
+        print(f"Avvio: import {_IMPORT_TIME * 1000:.0f} ms, "
+              f"interattivo dopo {interactive_ms:.0f} ms "
+              f"(configurazione da {self.config_source or 'nessuna'}, "
+              f"escluso l'avvio dell'interprete Python)")
+        if interactive_ms > STARTUP_BUDGET_MS:
+            print(f"Attenzione: avvio oltre il budget di {STARTUP_BUDGET_MS} ms")
         
     def show_platform_instructions(self):
         """Mostra istruzioni specifiche per la piattaforma"""
@@ -518,6 +1136,8 @@ class Soundboard:
                 "• Oppure click con il tasto centrale del mouse\n\n"
                 "Questo messaggio apparirà solo al primo avvio."
             )
+            return True
+        return False
         
     def setup_ui(self):
         # Menu
@@ -528,6 +1148,14 @@ class Soundboard:
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Salva Configurazione", command=self.save_config)
         file_menu.add_command(label="Carica Configurazione", command=self.load_config)
+        file_menu.add_separator()
+        file_menu.add_command(label="Avvia Registrazione", command=self.start_recording)
+        file_menu.add_command(label="Ferma Registrazione", command=self.stop_recording)
+        self.replay_var = tk.BooleanVar(value=False)
+        file_menu.add_checkbutton(label="Replay Buffer (ultimi 2 minuti)", variable=self.replay_var,
+                                  command=self.toggle_replay)
+        file_menu.add_command(label="Salva Ultimi Minuti", command=self.save_replay)
+        file_menu.add_separator()
         file_menu.add_command(label="Mostra Istruzioni", command=self.show_help)
         file_menu.add_command(label="Esci", command=self.on_closing)
         
@@ -598,8 +1226,81 @@ Usa combinazioni come: ctrl+1, alt+a, shift+space, etc.
             self.buttons.append(button_row)
             
     def button_callback(self, button):
-        # Callback per i tasti (se necessario)
-        pass
+        # Callback per i tasti: registra il trigger nella sessione. Il registratore
+        # non deve mai trattenere viste sullo snapshot mappato, quindi copia i dati
+        # del tasto (una sola volta) prima di passarli.
+        button.detach_snapshot()
+        self.recorder.record_trigger(button, button.label, button.hotkey, button.sound_data)
+        
+    def start_recording(self):
+        if self.recorder.is_recording:
+            messagebox.showinfo("Registrazione", "Registrazione già in corso")
+            return
+            
+        log_path = filedialog.asksaveasfilename(
+            title="Salva log della sessione",
+            defaultextension=".jsonl",
+            filetypes=[("Log eventi", "*.jsonl")]
+        )
+        if not log_path:
+            return
+            
+        mix_path = None
+        if messagebox.askyesno("Registrazione", "Vuoi registrare anche il mix audio?"):
+            mix_path = filedialog.asksaveasfilename(
+                title="Salva mix audio",
+                defaultextension=".wav",
+                filetypes=[("WAV", "*.wav"), ("FLAC", "*.flac")]
+            )
+            if not mix_path:
+                return
+                
+        try:
+            self.recorder.start_recording(log_path, mix_path)
+            self.root.title("Soundboard Personalizzabile - ● REC")
+        except Exception as e:
+            messagebox.showerror("Errore", f"Impossibile avviare la registrazione: {e}")
+            
+    def stop_recording(self):
+        recording = self.recorder.stop_recording()
+        if recording is None:
+            return
+        self.root.title("Soundboard Personalizzabile")
+        
+        # Non attendere il disco sul thread dell'interfaccia: controlla più tardi
+        self.root.after(100, lambda: self.check_recording_stopped(recording))
+        
+    def check_recording_stopped(self, recording):
+        if recording['writer'].is_alive():
+            self.root.after(100, lambda: self.check_recording_stopped(recording))
+            return
+            
+        if recording['error']:
+            messagebox.showerror("Errore", f"Registrazione interrotta: {recording['error']}")
+            return
+            
+        message = "Registrazione salvata!"
+        if recording['dropped_blocks']:
+            message += (f"\n\nAttenzione: {recording['dropped_blocks']} blocchi audio persi "
+                        "per rallentamenti del disco.")
+        messagebox.showinfo("Registrazione", message)
+        
+    def toggle_replay(self):
+        self.recorder.set_replay_enabled(self.replay_var.get())
+        
+    def save_replay(self):
+        path = filedialog.asksaveasfilename(
+            title="Salva ultimi minuti",
+            defaultextension=".wav",
+            filetypes=[("WAV", "*.wav")]
+        )
+        if not path:
+            return
+        try:
+            seconds = self.recorder.save_replay(path)
+            messagebox.showinfo("Successo", f"Salvati gli ultimi {seconds:.0f} secondi!")
+        except Exception as e:
+            messagebox.showerror("Errore", f"Errore nel salvataggio: {e}")
         
     def save_config(self):
         config = {
@@ -613,18 +1314,59 @@ Usa combinazioni come: ctrl+1, alt+a, shift+space, etc.
             config['buttons'].append(row_config)
             
         try:
-            with open('soundboard_config.json', 'w') as f:
+            with open(CONFIG_FILE, 'w') as f:
                 json.dump(config, f, indent=2)
-            messagebox.showinfo("Successo", "Configurazione salvata!")
         except Exception as e:
             messagebox.showerror("Errore", f"Errore nel salvataggio: {e}")
+            return
+            
+        # Aggiorna lo snapshot precompilato per il prossimo avvio
+        # (prima chiudi la mappatura di quello vecchio, che verrà sostituito)
+        message = "Configurazione salvata!"
+        try:
+            self.release_snapshot()
+            BoardSnapshot().write(self.buttons)
+        except Exception as e:
+            print(f"Errore nella scrittura dello snapshot: {e}")
+            message += f"\n\nSnapshot per l'avvio rapido non aggiornato: {e}"
+        messagebox.showinfo("Successo", message)
+            
+    def release_snapshot(self):
+        """Stacca i tasti dallo snapshot mappato e chiude la mappatura"""
+        for row in self.buttons:
+            for button in row:
+                button.detach_snapshot()
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
             
     def load_config(self):
         try:
-            if os.path.exists('soundboard_config.json'):
-                with open('soundboard_config.json', 'r') as f:
+            self.release_snapshot()
+        except RuntimeError as e:
+            print(f"Errore nella chiusura dello snapshot: {e}")
+        snapshot = BoardSnapshot()
+        try:
+            rows = snapshot.load()
+        except Exception as e:
+            print(f"Snapshot non valido, uso la configurazione JSON: {e}")
+            rows = None
+            
+        if rows is not None:
+            self.snapshot = snapshot
+            for row_idx, row_entries in enumerate(rows):
+                for col_idx, entry in enumerate(row_entries):
+                    if row_idx < len(self.buttons) and col_idx < len(self.buttons[row_idx]):
+                        self.buttons[row_idx][col_idx].load_snapshot(entry)
+            self.config_source = 'snapshot'
+            return
+            
+        try:
+            if os.path.exists(CONFIG_FILE):
+                with open(CONFIG_FILE, 'r') as f:
                     config = json.load(f)
                     
+                self.config_source = 'json'
                 if 'buttons' in config:
                     for row_idx, row_config in enumerate(config['buttons']):
                         for col_idx, button_config in enumerate(row_config):
@@ -646,6 +1388,9 @@ Usa combinazioni come: ctrl+1, alt+a, shift+space, etc.
                     except:
                         pass
         
+        # Chiudi la registrazione (svuota le code su disco)
+        self.recorder.shutdown()
+        
         # Chiudi pygame
         pygame.mixer.quit()
         self.root.destroy()